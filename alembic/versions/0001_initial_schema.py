@@ -0,0 +1,72 @@
+"""initial schema
+
+Databases created by the old create_all startup hook match this revision;
+run ``alembic stamp 0001`` on them before ``alembic upgrade head``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15 22:03:26.133593
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "devices",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("ip_address", sa.String(length=45), nullable=False),
+        sa.Column("mac_address", sa.String(length=17), nullable=False),
+        sa.Column("name", sa.String(length=120), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_devices_id"), "devices", ["id"], unique=False)
+    op.create_index(op.f("ix_devices_ip_address"), "devices", ["ip_address"], unique=True)
+    op.create_index(op.f("ix_devices_mac_address"), "devices", ["mac_address"], unique=True)
+    op.create_table(
+        "router_config",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("router_ip", sa.String(length=45), nullable=False),
+        sa.Column("access_mode", sa.String(length=20), nullable=False),
+        sa.Column("snmp_enabled", sa.Boolean(), nullable=False),
+        sa.Column("snmp_community", sa.String(length=120), nullable=True),
+        sa.Column("snmp_port", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=120), nullable=True),
+        sa.Column("password", sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_router_config_router_ip"), "router_config", ["router_ip"], unique=True
+    )
+    op.create_table(
+        "traffic_samples",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("device_id", sa.Integer(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("bytes_in", sa.Integer(), nullable=False),
+        sa.Column("bytes_out", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["device_id"], ["devices.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_traffic_samples_id"), "traffic_samples", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_traffic_samples_id"), table_name="traffic_samples")
+    op.drop_table("traffic_samples")
+    op.drop_index(op.f("ix_router_config_router_ip"), table_name="router_config")
+    op.drop_table("router_config")
+    op.drop_index(op.f("ix_devices_mac_address"), table_name="devices")
+    op.drop_index(op.f("ix_devices_ip_address"), table_name="devices")
+    op.drop_index(op.f("ix_devices_id"), table_name="devices")
+    op.drop_table("devices")
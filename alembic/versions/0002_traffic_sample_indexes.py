@@ -0,0 +1,33 @@
+"""traffic sample indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15 22:10:41.512604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_traffic_device_ts",
+        "traffic_samples",
+        ["device_id", sa.text("timestamp DESC")],
+        unique=False,
+    )
+    op.create_index("ix_traffic_ts", "traffic_samples", [sa.text("timestamp DESC")], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_traffic_ts", table_name="traffic_samples")
+    op.drop_index("ix_traffic_device_ts", table_name="traffic_samples")
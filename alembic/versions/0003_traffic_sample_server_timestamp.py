@@ -0,0 +1,45 @@
+"""traffic sample server-side timestamp
+
+Existing values were written with datetime.utcnow(), so they are converted
+as UTC rather than in the session time zone.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15 22:31:07.208114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "traffic_samples",
+        "timestamp",
+        existing_type=sa.DateTime(),
+        type_=sa.DateTime(timezone=True),
+        existing_nullable=False,
+        server_default=sa.func.now(),
+        postgresql_using="timestamp AT TIME ZONE 'UTC'",
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "traffic_samples",
+        "timestamp",
+        existing_type=sa.DateTime(timezone=True),
+        type_=sa.DateTime(),
+        existing_nullable=False,
+        server_default=None,
+        postgresql_using="timestamp AT TIME ZONE 'UTC'",
+    )
@@ -1,96 +1,168 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncScalarResult, AsyncSession
+from sqlalchemy.orm import raiseload
 
-from app import models
+from app import models, schemas
 
+# Session.info key holding the router config read during the current request.
+ROUTER_CONFIG_CACHE_KEY = "router_config"
+# Rows fetched per round trip by the streaming list queries.
+STREAM_BATCH_SIZE = 1000
 
-def get_devices(db: Session) -> list[models.Device]:
-    return db.query(models.Device).order_by(models.Device.id).all()
+# Constant statements for hot paths, built once at import time.
+_LIST_DEVICES = select(models.Device).options(raiseload("*")).order_by(models.Device.id)
+_GET_ROUTER_CONFIG = select(models.RouterConfig).limit(1)
 
 
-def create_device(db: Session, device: models.Device) -> models.Device:
-    db.add(device)
-    db.commit()
-    db.refresh(device)
-    return device
-
-
-def get_device(db: Session, device_id: int) -> models.Device | None:
-    return db.query(models.Device).filter(models.Device.id == device_id).first()
+async def stream_devices(db: AsyncSession) -> AsyncScalarResult[models.Device]:
+    return await db.stream_scalars(_LIST_DEVICES.execution_options(yield_per=STREAM_BATCH_SIZE))
 
 
-def get_device_by_ip(db: Session, ip_address: str) -> models.Device | None:
-    return db.query(models.Device).filter(models.Device.ip_address == ip_address).first()
+async def create_device(db: AsyncSession, payload: schemas.DeviceCreate) -> models.Device:
+    device = (
+        await db.scalars(
+            insert(models.Device).values(**payload.model_dump()).returning(models.Device)
+        )
+    ).one()
+    await db.commit()
+    return device
 
 
-def get_device_by_mac(db: Session, mac_address: str) -> models.Device | None:
-    return db.query(models.Device).filter(models.Device.mac_address == mac_address).first()
+async def get_device(db: AsyncSession, device_id: int) -> models.Device | None:
+    return await db.get(models.Device, device_id)
 
 
-def update_device_name(db: Session, device: models.Device, name: str | None) -> models.Device:
-    device.name = name
-    db.commit()
-    db.refresh(device)
+async def update_device_name(
+    db: AsyncSession, device_id: int, name: str | None
+) -> models.Device | None:
+    device = (
+        await db.scalars(
+            update(models.Device)
+            .where(models.Device.id == device_id)
+            .values(name=name)
+            .returning(models.Device)
+        )
+    ).one_or_none()
+    await db.commit()
     return device
 
 
-def create_traffic_sample(db: Session, sample: models.TrafficSample) -> models.TrafficSample:
-    db.add(sample)
-    db.commit()
-    db.refresh(sample)
-    return sample
-
-
-def get_traffic_samples(db: Session, device_id: int | None = None) -> list[models.TrafficSample]:
-    query = db.query(models.TrafficSample).order_by(models.TrafficSample.timestamp.desc())
+def _traffic_samples_query(device_id: int | None, limit: int) -> Select:
+    query = (
+        select(models.TrafficSample)
+        .options(raiseload("*"))
+        .order_by(models.TrafficSample.timestamp.desc(), models.TrafficSample.id.desc())
+    )
     if device_id:
-        query = query.filter(models.TrafficSample.device_id == device_id)
-    return query.all()
-
-
-def get_router_config(db: Session) -> models.RouterConfig | None:
-    return db.query(models.RouterConfig).first()
-
-
-def upsert_router_config(db: Session, config: models.RouterConfig) -> models.RouterConfig:
-    existing = get_router_config(db)
-    if existing:
-        existing.router_ip = config.router_ip
-        existing.access_mode = config.access_mode
-        existing.snmp_enabled = config.snmp_enabled
-        existing.snmp_community = config.snmp_community
-        existing.snmp_port = config.snmp_port
-        existing.username = config.username
-        existing.password = config.password
-        db.commit()
-        db.refresh(existing)
-        return existing
-    db.add(config)
-    db.commit()
-    db.refresh(config)
+        query = query.where(models.TrafficSample.device_id == device_id)
+    return query.limit(limit)
+
+
+async def stream_traffic_samples(
+    db: AsyncSession, device_id: int | None = None, limit: int = 100
+) -> AsyncScalarResult[models.TrafficSample]:
+    return await db.stream_scalars(
+        _traffic_samples_query(device_id, limit).execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+
+async def get_router_config(db: AsyncSession) -> models.RouterConfig | None:
+    if ROUTER_CONFIG_CACHE_KEY not in db.info:
+        db.info[ROUTER_CONFIG_CACHE_KEY] = await db.scalar(_GET_ROUTER_CONFIG)
+    return db.info[ROUTER_CONFIG_CACHE_KEY]
+
+
+async def upsert_router_config(
+    db: AsyncSession, payload: schemas.RouterConfigCreate
+) -> models.RouterConfig:
+    values = payload.model_dump()
+    cached = db.info.get(ROUTER_CONFIG_CACHE_KEY)
+    if cached is not None:
+        target_id = cached.id
+    else:
+        target_id = select(models.RouterConfig.id).limit(1).scalar_subquery()
+    config = (
+        await db.scalars(
+            update(models.RouterConfig)
+            .where(models.RouterConfig.id == target_id)
+            .values(**values)
+            .returning(models.RouterConfig)
+        )
+    ).one_or_none()
+    if config is None:
+        config = (
+            await db.scalars(
+                insert(models.RouterConfig).values(**values).returning(models.RouterConfig)
+            )
+        ).one()
+    await db.commit()
+    db.info[ROUTER_CONFIG_CACHE_KEY] = config
     return config
 
 
-def upsert_discovered_devices(
-    db: Session, discovered: list[tuple[str, str]]
+async def upsert_discovered_devices(
+    db: AsyncSession, discovered: list[tuple[str, str]]
 ) -> list[models.Device]:
-    saved: list[models.Device] = []
+    # A MAC seen at several IPs (multi-homed hosts, proxy ARP) ends up at the
+    # last one, as it did when each entry was saved in turn. Walking backwards
+    # lets later entries claim their IP and MAC first.
+    claimed_ips: set[str] = set()
+    claimed_macs: set[str] = set()
+    latest: list[tuple[str, str]] = []
+    for ip_address, mac_address in reversed(discovered):
+        if ip_address in claimed_ips or mac_address in claimed_macs:
+            continue
+        claimed_ips.add(ip_address)
+        claimed_macs.add(mac_address)
+        latest.append((ip_address, mac_address))
+    discovered = latest[::-1]
+    if not discovered:
+        return []
+    ips = {ip_address for ip_address, _ in discovered}
+    macs = {mac_address for _, mac_address in discovered}
+    known = (
+        await db.scalars(
+            select(models.Device).where(
+                or_(models.Device.ip_address.in_(ips), models.Device.mac_address.in_(macs))
+            )
+        )
+    ).all()
+    by_ip = {device.ip_address: device for device in known}
+    by_mac = {device.mac_address: device for device in known}
+
+    moved: dict[str, models.Device] = {}
+    rows: list[dict[str, str]] = []
     for ip_address, mac_address in discovered:
-        existing_ip = get_device_by_ip(db, ip_address)
-        existing_mac = get_device_by_mac(db, mac_address)
+        existing_ip = by_ip.get(ip_address)
+        existing_mac = by_mac.get(mac_address)
 
         if existing_ip and existing_mac and existing_ip.id != existing_mac.id:
             continue
 
-        device = existing_ip or existing_mac
-        if device:
-            device.ip_address = ip_address
-            device.mac_address = mac_address
+        if existing_mac and not existing_ip:
+            existing_mac.ip_address = ip_address
+            moved[ip_address] = existing_mac
         else:
-            device = models.Device(ip_address=ip_address, mac_address=mac_address)
-            db.add(device)
-        saved.append(device)
-
-    db.commit()
-    for device in saved:
-        db.refresh(device)
+            rows.append({"ip_address": ip_address, "mac_address": mac_address})
+
+    if moved:
+        await db.flush()
+
+    upserted: dict[str, models.Device] = {}
+    if rows:
+        stmt = pg_insert(models.Device).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.Device.ip_address],
+            set_={"mac_address": stmt.excluded.mac_address},
+        ).returning(models.Device)
+        result = await db.scalars(stmt, execution_options={"populate_existing": True})
+        upserted = {device.ip_address: device for device in result}
+
+    await db.commit()
+    saved: list[models.Device] = []
+    for ip_address, _ in discovered:
+        device = moved.get(ip_address) or upserted.get(ip_address)
+        if device is not None:
+            saved.append(device)
     return saved
@@ -2,11 +2,24 @@ from __future__ import annotations
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import ipaddress
+import os
 import re
+import select
+import socket
 import subprocess
 import sys
+import time
 from typing import Iterable
 
+from app import icmp
+
+ARP_WARM_COVERAGE = 0.5
+PROC_NET_ARP = "/proc/net/arp"
+
+_MAC_FULL_RE = re.compile(r"[0-9a-f]{2}(?::[0-9a-f]{2}){5}")
+_MAC_SCAN_RE = re.compile(r"[0-9a-fA-F]{2}(?:[:-][0-9a-fA-F]{2}){5}")
+_IP_SCAN_RE = re.compile(r"(?:\d{1,3}\.){3}\d{1,3}")
+
 
 class DiscoveryError(RuntimeError):
     pass
@@ -14,7 +27,7 @@ class DiscoveryError(RuntimeError):
 
 def _normalize_mac(value: str) -> str | None:
     mac = value.strip().lower().replace("-", ":")
-    if re.fullmatch(r"[0-9a-f]{2}(:[0-9a-f]{2}){5}", mac) is None:
+    if _MAC_FULL_RE.fullmatch(mac) is None:
         return None
     if mac in {"00:00:00:00:00:00", "ff:ff:ff:ff:ff:ff"}:
         return None
@@ -53,17 +66,74 @@ def _ping_host(host: str, timeout_ms: int) -> None:
         return
 
 
-def _ping_sweep(network: ipaddress.IPv4Network, timeout_ms: int = 400, workers: int = 64) -> None:
-    hosts = [str(ip) for ip in network.hosts()]
+def _icmp_sweep(sock: socket.socket, hosts: list[str], timeout_ms: int) -> None:
+    ident = os.getpid() & 0xFFFF
+    for seq, host in enumerate(hosts):
+        try:
+            sock.sendto(icmp.echo_request(ident, seq & 0xFFFF), (host, 0))
+        except OSError:
+            continue
+    pending = set(hosts)
+    deadline = time.monotonic() + timeout_ms / 1000
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        readable, _, _ = select.select([sock], [], [], remaining)
+        if not readable:
+            break
+        try:
+            _, address = sock.recvfrom(1024)
+        except OSError:
+            continue
+        pending.discard(address[0])
+
+
+def _ping_sweep(hosts: list[str], timeout_ms: int = 400, workers: int = 64) -> None:
     if not hosts:
         return
+    # One socket serves the whole sweep.
+    sock = icmp.open_socket()
+    if sock is not None:
+        with sock:
+            _icmp_sweep(sock, hosts, timeout_ms)
+        return
     with ThreadPoolExecutor(max_workers=min(workers, len(hosts))) as executor:
         futures = [executor.submit(_ping_host, host, timeout_ms) for host in hosts]
         for future in as_completed(futures):
             future.result()
 
 
+def _read_proc_arp() -> list[tuple[str, str]] | None:
+    try:
+        with open(PROC_NET_ARP, encoding="ascii", errors="replace") as handle:
+            lines = handle.read().splitlines()[1:]
+    except OSError:
+        return None
+    entries: list[tuple[str, str]] = []
+    for line in lines:
+        # IP address, HW type, Flags, HW address, Mask, Device
+        fields = line.split()
+        if len(fields) < 4:
+            continue
+        try:
+            flags = int(fields[2], 16)
+        except ValueError:
+            continue
+        if flags == 0:
+            continue
+        mac = _normalize_mac(fields[3])
+        if not mac:
+            continue
+        entries.append((fields[0], mac))
+    return entries
+
+
 def _read_arp_table() -> list[tuple[str, str]]:
+    if sys.platform.startswith("linux"):
+        entries = _read_proc_arp()
+        if entries is not None:
+            return entries
     try:
         result = subprocess.run(
             ["arp", "-a"],
@@ -75,12 +145,10 @@ def _read_arp_table() -> list[tuple[str, str]]:
     except Exception as exc:
         raise DiscoveryError(f"Failed to read ARP table: {exc}") from exc
     output = (result.stdout or "") + (result.stderr or "")
-    ip_regex = re.compile(r"(?:\\d{1,3}\\.){3}\\d{1,3}")
-    mac_regex = re.compile(r"[0-9a-fA-F]{2}(?:[:-][0-9a-fA-F]{2}){5}")
     entries: list[tuple[str, str]] = []
     for line in output.splitlines():
-        ip_match = ip_regex.search(line)
-        mac_match = mac_regex.search(line)
+        ip_match = _IP_SCAN_RE.search(line)
+        mac_match = _MAC_SCAN_RE.search(line)
         if not ip_match or not mac_match:
             continue
         mac = _normalize_mac(mac_match.group(0))
@@ -90,6 +158,12 @@ def _read_arp_table() -> list[tuple[str, str]]:
     return entries
 
 
+def _entries_in_network(
+    entries: Iterable[tuple[str, str]], valid_ips: frozenset[str]
+) -> dict[str, str]:
+    return {ip_str: mac for ip_str, mac in entries if ip_str in valid_ips}
+
+
 def discover_devices(
     router_ip: str | None,
     subnet_cidr: str | None = None,
@@ -98,16 +172,14 @@ def discover_devices(
     network = _resolve_network(router_ip, subnet_cidr)
     if mode not in {"arp_only", "ping_sweep"}:
         raise DiscoveryError("Invalid discovery mode. Use arp_only or ping_sweep.")
+    hosts = [str(ip) for ip in network.hosts()]
+    valid_ips = frozenset(hosts)
+    discovered = _entries_in_network(_read_arp_table(), valid_ips)
     if mode == "ping_sweep":
-        _ping_sweep(network)
-    entries = _read_arp_table()
-    discovered: dict[str, str] = {}
-    for ip_str, mac in entries:
-        try:
-            ip = ipaddress.ip_address(ip_str)
-        except ValueError:
-            continue
-        if ip not in network:
-            continue
-        discovered[ip_str] = mac
+        missing = [host for host in hosts if host not in discovered]
+        # A warm ARP cache already covers the subnet well enough; otherwise
+        # only probe the hosts it does not know about yet.
+        if missing and len(discovered) < ARP_WARM_COVERAGE * len(hosts):
+            _ping_sweep(missing)
+            discovered.update(_entries_in_network(_read_arp_table(), valid_ips))
     return [(ip, mac) for ip, mac in discovered.items()]
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import socket
+import struct
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_PAYLOAD = b"network-monitor"
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def echo_request(ident: int, seq: int) -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + ICMP_PAYLOAD)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + ICMP_PAYLOAD
+
+
+def open_socket() -> socket.socket | None:
+    # SOCK_DGRAM works unprivileged on Linux (net.ipv4.ping_group_range) and
+    # macOS; SOCK_RAW needs root/admin.
+    for sock_type in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            return socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except (OSError, AttributeError):
+            continue
+    return None
+
+
+def parse_echo_reply(packet: bytes) -> tuple[int, int] | None:
+    """Return ``(ident, seq)`` of an echo reply, or ``None`` for anything else.
+
+    Raw sockets, and datagram sockets on macOS, hand back the IPv4 header in
+    front of the ICMP message; Linux datagram sockets do not.
+    """
+    if packet and packet[0] >> 4 == 4:
+        packet = packet[(packet[0] & 0x0F) * 4 :]
+    if len(packet) < 8 or packet[0] != ICMP_ECHO_REPLY:
+        return None
+    _, _, _, ident, seq = struct.unpack("!BBHHH", packet[:8])
+    return ident, seq
@@ -1,19 +1,33 @@
+import asyncio
+from datetime import datetime, timezone
+from functools import partial
 import logging
 import os
+from typing import AsyncIterator, Awaitable, Callable
 
-from fastapi import Body, Depends, FastAPI, HTTPException
+from fastapi import Body, Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
-
-from app import crud, models, schemas
-from app.db import engine, get_db, test_db_connection
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
+import msgspec
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncScalarResult, AsyncSession
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+
+from app import crud, schemas, schemas_fast
+from app.db import SessionLocal, get_db, test_db_connection
 from app.discovery import DiscoveryError, discover_devices
 from app.snmp import SnmpError, collect_snmp_metrics, passive_probe
+from app.traffic_buffer import traffic_buffer
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Network Monitor API")
+# Rows read back from our own database were validated on the way in, so by
+# default they are serialized through model_construct instead of re-validated.
+TRUSTED_DB = os.getenv("TRUSTED_DB", "1") == "1"
+
+app = FastAPI(title="Network Monitor API", default_response_class=ORJSONResponse)
 
 cors_origins = [
     origin.strip()
@@ -33,125 +47,202 @@ app.add_middleware(
 
 
 @app.on_event("startup")
-def on_startup():
-    test_db_connection()
-    try:
-        models.Base.metadata.create_all(bind=engine)
-    except Exception:
-        logger.exception("Failed to create database tables on startup.")
-        raise
+async def on_startup():
+    # The schema is managed by Alembic (``alembic upgrade head``), run once per
+    # deploy rather than by every worker.
+    if os.getenv("APP_CHECK_DB") == "1":
+        await test_db_connection()
+    await traffic_buffer.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await traffic_buffer.stop()
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
+async def _encode_json_array(
+    db: AsyncSession, rows: AsyncScalarResult, row_type: type[msgspec.Struct]
+) -> AsyncIterator[bytes]:
+    batch_type = list[row_type]
+    separator = b""
+    try:
+        yield b"["
+        async for batch in rows.partitions():
+            items = msgspec.convert(batch, batch_type, from_attributes=True)
+            # Each batch encodes as "[...]"; strip the brackets to splice it in.
+            yield separator + schemas_fast.encoder.encode(items)[1:-1]
+            separator = b","
+        yield b"]"
+    finally:
+        await db.close()
+
+
+async def _stream_json_array(
+    fetch: Callable[[AsyncSession], Awaitable[AsyncScalarResult]],
+    row_type: type[msgspec.Struct],
+) -> StreamingResponse:
+    # The status line goes out before the body is iterated, so the query runs
+    # here and its errors still become a 500. The stream owns the session from
+    # then on; the background task also closes it if the body is never read.
+    db = SessionLocal()
+    try:
+        rows = await fetch(db)
+    except BaseException:
+        await db.close()
+        raise
+    return StreamingResponse(
+        _encode_json_array(db, rows, row_type),
+        media_type="application/json",
+        background=BackgroundTask(db.close),
+    )
+
+
+def _trusted_response(schema: type[BaseModel], result, status_code: int = 200):
+    if not TRUSTED_DB or result is None:
+        return result
+    return ORJSONResponse(schema.from_orm_fast(result).model_dump(), status_code=status_code)
+
+
+def _list_response(adapter: TypeAdapter, schema: type[BaseModel], rows: list) -> Response:
+    if TRUSTED_DB:
+        items = [schema.from_orm_fast(row) for row in rows]
+    else:
+        items = adapter.validate_python(rows, from_attributes=True)
+    return Response(adapter.dump_json(items), media_type="application/json")
+
+
 @app.get("/devices", response_model=list[schemas.Device])
-def list_devices(db: Session = Depends(get_db)):
-    return crud.get_devices(db)
+async def list_devices():
+    return await _stream_json_array(crud.stream_devices, schemas_fast.Device)
 
 
 @app.post("/devices", response_model=schemas.Device, status_code=201)
-def create_device(payload: schemas.DeviceCreate, db: Session = Depends(get_db)):
-    device = models.Device(
-        ip_address=payload.ip_address,
-        mac_address=payload.mac_address,
-        name=payload.name,
-    )
-    return crud.create_device(db, device)
+async def create_device(payload: schemas.DeviceCreate, db: AsyncSession = Depends(get_db)):
+    device = await crud.create_device(db, payload)
+    return _trusted_response(schemas.Device, device, status_code=201)
 
 
 @app.post("/devices/discover", response_model=list[schemas.Device])
-def discover_network_devices(
+async def discover_network_devices(
     payload: schemas.DiscoveryRequest = Body(default=schemas.DiscoveryRequest()),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    config = crud.get_router_config(db)
+    config = await crud.get_router_config(db)
     router_ip = config.router_ip if config else None
     try:
-        discovered = discover_devices(
+        discovered = await run_in_threadpool(
+            discover_devices,
             router_ip=router_ip,
             subnet_cidr=payload.subnet_cidr,
             mode=payload.mode,
         )
     except DiscoveryError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
-    return crud.upsert_discovered_devices(db, discovered)
+    devices = await crud.upsert_discovered_devices(db, discovered)
+    return _list_response(schemas.DeviceListAdapter, schemas.Device, devices)
 
 
 @app.patch("/devices/{device_id}", response_model=schemas.Device)
-def update_device(device_id: int, payload: schemas.DeviceUpdate, db: Session = Depends(get_db)):
-    device = crud.get_device(db, device_id)
+async def update_device(
+    device_id: int, payload: schemas.DeviceUpdate, db: AsyncSession = Depends(get_db)
+):
+    device = await crud.update_device_name(db, device_id, payload.name)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
-    return crud.update_device_name(db, device, payload.name)
+    return _trusted_response(schemas.Device, device)
 
 
 @app.get("/traffic", response_model=list[schemas.TrafficSample])
-def list_traffic(device_id: int | None = None, db: Session = Depends(get_db)):
-    return crud.get_traffic_samples(db, device_id=device_id)
+async def list_traffic(
+    device_id: int | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    return await _stream_json_array(
+        partial(crud.stream_traffic_samples, device_id=device_id, limit=limit),
+        schemas_fast.TrafficSample,
+    )
 
 
-@app.post("/traffic", response_model=schemas.TrafficSample, status_code=201)
-def create_traffic(payload: schemas.TrafficSampleCreate, db: Session = Depends(get_db)):
-    device = crud.get_device(db, payload.device_id)
+@app.post("/traffic", response_model=schemas.TrafficSampleCreate, status_code=202)
+async def create_traffic(
+    payload: schemas.TrafficSampleCreate, db: AsyncSession = Depends(get_db)
+):
+    device = await crud.get_device(db, payload.device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
-    sample = models.TrafficSample(
-        device_id=payload.device_id,
-        bytes_in=payload.bytes_in,
-        bytes_out=payload.bytes_out,
-    )
-    return crud.create_traffic_sample(db, sample)
+    row = payload.model_dump()
+    # Stamp the receipt time here: rows are flushed in batches, and a batch
+    # written in one transaction would otherwise share a single now().
+    row["timestamp"] = datetime.now(timezone.utc)
+    await traffic_buffer.put(row)
+    return payload
 
 
 @app.get("/router-config", response_model=schemas.RouterConfig | None)
-def get_router_config(db: Session = Depends(get_db)):
-    return crud.get_router_config(db)
+async def get_router_config(db: AsyncSession = Depends(get_db)):
+    config = await crud.get_router_config(db)
+    return _trusted_response(schemas.RouterConfig, config)
 
 
 @app.put("/router-config", response_model=schemas.RouterConfig)
-def upsert_router_config(payload: schemas.RouterConfigCreate, db: Session = Depends(get_db)):
-    config = models.RouterConfig(
-        router_ip=payload.router_ip,
-        access_mode=payload.access_mode,
-        snmp_enabled=payload.snmp_enabled,
-        snmp_community=payload.snmp_community,
-        snmp_port=payload.snmp_port,
-        username=payload.username,
-        password=payload.password,
-    )
-    return crud.upsert_router_config(db, config)
+async def upsert_router_config(
+    payload: schemas.RouterConfigCreate, db: AsyncSession = Depends(get_db)
+):
+    config = await crud.upsert_router_config(db, payload)
+    return _trusted_response(schemas.RouterConfig, config)
+
+
+class _MetricsResponse(ORJSONResponse):
+    """Encodes the collectors' dicts as-is, with UTC datetimes as ...Z."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+async def _collect_snmp(
+    config: schemas.RouterConfigRuntime,
+) -> tuple[dict | None, SnmpError | None]:
+    try:
+        metrics = await run_in_threadpool(
+            collect_snmp_metrics,
+            router_ip=config.router_ip,
+            community=config.snmp_community,
+            port=config.snmp_port or 161,
+        )
+    except SnmpError as exc:
+        return None, exc
+    return metrics, None
 
 
 @app.get("/router-metrics")
-def get_router_metrics(db: Session = Depends(get_db)):
-    config = crud.get_router_config(db)
-    if not config:
+async def get_router_metrics(db: AsyncSession = Depends(get_db)):
+    stored = await crud.get_router_config(db)
+    if not stored:
         raise HTTPException(status_code=404, detail="Router config not set")
+    config = schemas.RouterConfigRuntime.from_config(stored)
     if config.snmp_enabled and config.snmp_community:
-        try:
-            metrics = collect_snmp_metrics(
-                router_ip=config.router_ip,
-                community=config.snmp_community,
-                port=config.snmp_port or 161,
-            )
-        except SnmpError as exc:
-            fallback = passive_probe(config.router_ip, reason="snmp_error")
-            fallback["snmp_error"] = str(exc)
-            return fallback
-        passive = passive_probe(config.router_ip, reason="snmp_enabled")
+        # The SNMP poll and the ping are independent, so wait for both at once.
+        (metrics, snmp_error), passive = await asyncio.gather(
+            _collect_snmp(config),
+            passive_probe(config.router_ip, reason="snmp_enabled"),
+        )
+        if snmp_error is not None:
+            passive["passive_reason"] = "snmp_error"
+            passive["snmp_error"] = str(snmp_error)
+            return _MetricsResponse(passive)
         metrics["reachable"] = passive.get("reachable")
         metrics["latency_ms"] = passive.get("latency_ms")
         metrics["passive_status"] = passive.get("status")
-        return metrics
-    return passive_probe(config.router_ip, reason="snmp_disabled")
+        return _MetricsResponse(metrics)
+    return _MetricsResponse(await passive_probe(config.router_ip, reason="snmp_disabled"))
 
 
-@app.get("/setup", response_class=HTMLResponse)
-def setup_page():
-    return """
+_SETUP_HTML = """
     <!doctype html>
     <html lang="pt-BR">
       <head>
@@ -240,3 +331,13 @@ def setup_page():
       </body>
     </html>
     """
+_SETUP_HTML_BYTES = _SETUP_HTML.encode("utf-8")
+
+
+@app.get("/setup", response_class=HTMLResponse)
+async def setup_page():
+    return Response(
+        content=_SETUP_HTML_BYTES,
+        media_type="text/html; charset=utf-8",
+        headers={"Cache-Control": "public, max-age=3600"},
+    )
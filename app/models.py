@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -27,13 +27,18 @@ class TrafficSample(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     device_id: Mapped[int] = mapped_column(ForeignKey("devices.id"))
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     bytes_in: Mapped[int] = mapped_column(Integer, default=0)
     bytes_out: Mapped[int] = mapped_column(Integer, default=0)
 
     device: Mapped[Device] = relationship(back_populates="traffic_samples")
 
 
+# Serves "latest samples" listings both per device and across all devices.
+Index("ix_traffic_device_ts", TrafficSample.device_id, TrafficSample.timestamp.desc())
+Index("ix_traffic_ts", TrafficSample.timestamp.desc())
+
+
 class RouterConfig(Base):
     __tablename__ = "router_config"
 
@@ -1,7 +1,8 @@
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, model_validator
+from pydantic import BaseModel, ConfigDict, TypeAdapter, model_validator
 
 
 class DeviceBase(BaseModel):
@@ -22,6 +23,16 @@ class Device(DeviceBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
 
+    @classmethod
+    def from_orm_fast(cls, row) -> "Device":
+        return cls.model_construct(
+            id=row.id, ip_address=row.ip_address, mac_address=row.mac_address, name=row.name
+        )
+
+
+# Built once: list responses are dumped in a single pydantic-core pass.
+DeviceListAdapter = TypeAdapter(list[Device])
+
 
 class TrafficSampleBase(BaseModel):
     device_id: int
@@ -38,6 +49,16 @@ class TrafficSample(TrafficSampleBase):
     id: int
     timestamp: datetime
 
+    @classmethod
+    def from_orm_fast(cls, row) -> "TrafficSample":
+        return cls.model_construct(
+            id=row.id,
+            device_id=row.device_id,
+            bytes_in=row.bytes_in,
+            bytes_out=row.bytes_out,
+            timestamp=row.timestamp,
+        )
+
 
 RouterAccessMode = Literal["local_admin", "cloud_only", "isp_managed"]
 
@@ -86,6 +107,45 @@ class RouterConfig(RouterConfigBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
 
+    @classmethod
+    def from_orm_fast(cls, row) -> "RouterConfig":
+        return cls.model_construct(
+            id=row.id,
+            router_ip=row.router_ip,
+            access_mode=row.access_mode,
+            username=row.username,
+            password=row.password,
+            snmp_enabled=row.snmp_enabled,
+            snmp_community=row.snmp_community,
+            snmp_port=row.snmp_port,
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class RouterConfigRuntime:
+    """Plain snapshot of the router config handed to the collectors."""
+
+    router_ip: str
+    access_mode: str
+    username: str | None
+    password: str | None
+    snmp_enabled: bool
+    snmp_community: str | None
+    snmp_port: int
+
+    @classmethod
+    def from_config(cls, config) -> "RouterConfigRuntime":
+        """Copy from a stored row or any RouterConfig-shaped model."""
+        return cls(
+            router_ip=config.router_ip,
+            access_mode=config.access_mode,
+            username=config.username,
+            password=config.password,
+            snmp_enabled=config.snmp_enabled,
+            snmp_community=config.snmp_community,
+            snmp_port=config.snmp_port,
+        )
+
 
 class DiscoveryRequest(BaseModel):
     mode: Literal["arp_only", "ping_sweep"] = "ping_sweep"
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+import msgspec
+
+
+# msgspec mirrors of the response schemas, used to encode rows read back from
+# the database. Field order matches the pydantic models so the JSON is the same.
+class Device(msgspec.Struct, frozen=True, kw_only=True):
+    ip_address: str
+    mac_address: str
+    name: str | None = None
+    id: int
+
+
+class TrafficSample(msgspec.Struct, frozen=True, kw_only=True):
+    device_id: int
+    bytes_in: int
+    bytes_out: int
+    id: int
+    timestamp: datetime
+
+
+encoder = msgspec.json.Encoder()
@@ -1,27 +1,27 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import asyncio
+from datetime import datetime, timedelta, timezone
+import functools
+import itertools
+import os
+from operator import itemgetter
 import re
-import subprocess
+import socket
 import sys
+import threading
+import time
 from typing import Any
 
-try:
-    from pysnmp.hlapi import (
-        CommunityData,
-        ContextData,
-        ObjectIdentity,
-        ObjectType,
-        SnmpEngine,
-        UdpTransportTarget,
-        getCmd,
-        nextCmd,
-    )
-except Exception as exc:  # pragma: no cover - import guard
-    SnmpEngine = None  # type: ignore[assignment]
-    _pysnmp_import_error = exc
-else:
-    _pysnmp_import_error = None
+from app import icmp
+
+# pysnmp (with its MIB tree and pyasn1) is imported by _load_pysnmp() on the
+# first poll, so processes that never speak SNMP do not pay for it.
+_hlapi: Any = None
+_rfc1905: Any = None
+_univ: Any = None
+_pysnmp_import_error: Exception | None = None
+_pysnmp_lock = threading.Lock()
 
 
 SYS_UPTIME_OID = "1.3.6.1.2.1.1.3.0"
@@ -35,6 +35,20 @@ IF_IN_OID = "1.3.6.1.2.1.2.2.1.10"
 IF_OUT_OID = "1.3.6.1.2.1.2.2.1.16"
 IF_OPER_OID = "1.3.6.1.2.1.2.2.1.8"
 
+# Rows requested per GETBULK; a typical 24-port device fits in one or two.
+BULK_MAX_REPETITIONS = 25
+# Interface indices/names are re-walked this often; in between, counters are
+# read with plain GETs of the known rows, OID_BATCH_SIZE varBinds per PDU.
+OID_CACHE_TTL_S = 3600
+OID_BATCH_SIZE = 32
+# Targets whose SNMP engine is kept alive between polls.
+SESSION_CACHE_SIZE = 128
+
+# Seconds to wait for the router's echo reply in passive mode.
+PROBE_TIMEOUT_S = 1.5
+
+_LATENCY_RE = re.compile(r"(\d+(?:\.\d+)?)\s*ms")
+
 OPER_STATUS = {
     1: "up",
     2: "down",
@@ -50,18 +64,64 @@ class SnmpError(RuntimeError):
     pass
 
 
+# (router_ip, port, community) -> (expires_at, per-column row indices for the
+# counter and status columns, index -> name, counter_bits)
+_OID_CACHE: dict[tuple[str, int, str], tuple[float, list[list[int]], dict[int, Any], int]] = {}
+
+
+def _load_pysnmp() -> None:
+    global _hlapi, _rfc1905, _univ, _pysnmp_import_error
+    with _pysnmp_lock:
+        if _hlapi is not None or _pysnmp_import_error is not None:
+            return
+        try:
+            from pyasn1.type import univ
+            from pysnmp import hlapi
+            from pysnmp.proto import rfc1905
+        except Exception as exc:  # pragma: no cover - import guard
+            _pysnmp_import_error = exc
+            return
+        _univ = univ
+        _rfc1905 = rfc1905
+        _hlapi = hlapi
+
+
 def _snmp_session(router_ip: str, community: str, port: int, timeout: int, retries: int):
-    if SnmpEngine is None:
+    if _hlapi is None:
+        _load_pysnmp()
+    if _hlapi is None:
         raise SnmpError(f"pysnmp is not available: {_pysnmp_import_error}")
-    engine = SnmpEngine()
-    auth = CommunityData(community, mpModel=1)
-    target = UdpTransportTarget((router_ip, port), timeout=timeout, retries=retries)
-    context = ContextData()
+    engine = _hlapi.SnmpEngine()
+    auth = _hlapi.CommunityData(community, mpModel=1)
+    target = _hlapi.UdpTransportTarget((router_ip, port), timeout=timeout, retries=retries)
+    context = _hlapi.ContextData()
     return engine, auth, target, context
 
 
-def _snmp_get(engine, auth, target, context, oid: str):
-    iterator = getCmd(engine, auth, target, context, ObjectType(ObjectIdentity(oid)))
+@functools.lru_cache(maxsize=SESSION_CACHE_SIZE)
+def _cached_session(router_ip: str, community: str, port: int, timeout: int, retries: int):
+    """Reuse one engine (and its UDP socket and dispatcher) per target.
+
+    The returned tuple is shared between polls and must not be mutated; its
+    lock serializes use of the engine.
+    """
+    return (threading.Lock(), *_snmp_session(router_ip, community, port, timeout, retries))
+
+
+def _snmp_get(engine, auth, target, context, *oids: str) -> list[Any]:
+    """Fetch several scalars in one GET PDU.
+
+    Values the agent does not have (noSuchObject/noSuchInstance) come back as
+    ``None`` rather than failing the whole request.
+    """
+    iterator = _hlapi.getCmd(
+        engine,
+        auth,
+        target,
+        context,
+        *[_hlapi.ObjectType(_hlapi.ObjectIdentity(oid)) for oid in oids],
+        lookupMib=False,
+    )
     error_indication, error_status, error_index, var_binds = next(iterator)
     if error_indication:
         raise SnmpError(str(error_indication))
@@ -70,27 +130,45 @@ def _snmp_get(engine, auth, target, context, oid: str):
         if error_index and var_binds:
             location = f" at {var_binds[int(error_index) - 1][0]}"
         raise SnmpError(f"{error_status.prettyPrint()}{location}")
-    if not var_binds:
+    if len(var_binds) != len(oids):
         raise SnmpError("Empty SNMP response")
-    return var_binds[0][1]
-
-
-def _snmp_get_optional(engine, auth, target, context, oid: str):
-    try:
-        return _snmp_get(engine, auth, target, context, oid)
-    except SnmpError:
-        return None
-
-
-def _snmp_walk(engine, auth, target, context, base_oid: str) -> dict[str, Any]:
-    results: dict[str, Any] = {}
-    for error_indication, error_status, error_index, var_binds in nextCmd(
+    return [
+        None
+        if isinstance(value, (_rfc1905.NoSuchObject, _rfc1905.NoSuchInstance))
+        else _native(value)
+        for _, value in var_binds
+    ]
+
+
+def _snmp_bulk_walk(
+    engine,
+    auth,
+    target,
+    context,
+    base_oids: list[str],
+    max_repetitions: int = BULK_MAX_REPETITIONS,
+) -> list[dict[str, Any]]:
+    """Walk several table columns at once with GETBULK.
+
+    Each response row carries one varBind per requested column, in request
+    order, so a table of N rows costs roughly N / max_repetitions round trips
+    instead of one GETNEXT per cell. Returns one ``{index: value}`` dict per
+    base OID, keyed by the integer row index.
+    """
+    results: list[dict[str, Any]] = [{} for _ in base_oids]
+    # Names are compared as int tuples; a row's index is the one sub-id past
+    # its column's base OID.
+    bases = [tuple(int(part) for part in base_oid.split(".")) for base_oid in base_oids]
+    for error_indication, error_status, error_index, var_binds in _hlapi.bulkCmd(
         engine,
         auth,
         target,
         context,
-        ObjectType(ObjectIdentity(base_oid)),
+        0,
+        max_repetitions,
+        *[_hlapi.ObjectType(_hlapi.ObjectIdentity(base_oid)) for base_oid in base_oids],
         lexicographicMode=False,
+        lookupMib=False,
     ):
         if error_indication:
             raise SnmpError(str(error_indication))
@@ -99,18 +177,70 @@ def _snmp_walk(engine, auth, target, context, base_oid: str) -> dict[str, Any]:
             if error_index and var_binds:
                 location = f" at {var_binds[int(error_index) - 1][0]}"
             raise SnmpError(f"{error_status.prettyPrint()}{location}")
-        for name, value in var_binds:
-            name_str = name.prettyPrint()
-            if not name_str.startswith(f"{base_oid}."):
+        for column, (name, value) in enumerate(var_binds):
+            # Columns that ran out early are padded with endOfMibView.
+            if isinstance(value, _rfc1905.EndOfMibView):
+                continue
+            oid = name.asTuple()
+            base = bases[column]
+            if len(oid) != len(base) + 1 or oid[:-1] != base:
                 continue
-            index = name_str[len(base_oid) + 1 :]
-            results[index] = value
+            results[column][oid[-1]] = _native(value)
     return results
 
 
+def _snmp_get_columns(
+    engine,
+    auth,
+    target,
+    context,
+    base_oids: list[str],
+    column_indices: list[list[int]],
+    batch_size: int = OID_BATCH_SIZE,
+) -> list[dict[str, Any]] | None:
+    """GET the known cells of several columns, ``batch_size`` varBinds per PDU.
+
+    ``column_indices`` holds, per column, the rows the last walk returned.
+    Returns ``None`` as soon as one of those cells is missing, which means the
+    interface table changed and must be re-walked.
+    """
+    oids = [
+        (column, index)
+        for column, indices in enumerate(column_indices)
+        for index in indices
+    ]
+    results: list[dict[str, Any]] = [{} for _ in base_oids]
+    for start in range(0, len(oids), max(1, batch_size)):
+        batch = oids[start : start + batch_size]
+        values = _snmp_get(
+            engine,
+            auth,
+            target,
+            context,
+            *[f"{base_oids[column]}.{index}" for column, index in batch],
+        )
+        for (column, index), value in zip(batch, values):
+            if value is None:
+                return None
+            results[column][index] = value
+    return results
+
+
+def _native(value):
+    # Counters, gauges, TimeTicks and INTEGERs become plain ints and strings
+    # become str once, at parse time, so nothing downstream converts again.
+    if isinstance(value, _univ.Integer):
+        return int(value)
+    if isinstance(value, _univ.OctetString):
+        return str(value)
+    return value
+
+
 def _safe_int(value) -> int | None:
     if value is None:
         return None
+    if type(value) is int:
+        return value
     try:
         return int(value)
     except Exception:
@@ -118,23 +248,13 @@ def _safe_int(value) -> int | None:
 
 
 def _format_uptime(seconds: int) -> str:
-    days, rem = divmod(seconds, 86400)
-    hours, rem = divmod(rem, 3600)
-    minutes, secs = divmod(rem, 60)
+    # str(timedelta) gives "[N day(s), ]H:MM:SS"; reshape it to "[Nd ]HH:MM:SS".
+    days, _, clock = str(timedelta(seconds=max(seconds, 0))).rpartition(", ")
+    if len(clock) == 7:
+        clock = "0" + clock
     if days:
-        return f"{days}d {hours:02}:{minutes:02}:{secs:02}"
-    return f"{hours:02}:{minutes:02}:{secs:02}"
-
-
-def _match_interface(interfaces: list[dict[str, Any]], keywords: list[str]):
-    for interface in interfaces:
-        name = str(interface.get("name", "")).lower()
-        for keyword in keywords:
-            if keyword in name:
-                if keyword == "lan" and "wlan" in name:
-                    continue
-                return interface
-    return None
+        return f"{days.split(' ', 1)[0]}d {clock}"
+    return clock
 
 
 def collect_snmp_metrics(
@@ -143,72 +263,138 @@ def collect_snmp_metrics(
     port: int = 161,
     timeout: int = 2,
     retries: int = 1,
+    max_repetitions: int = BULK_MAX_REPETITIONS,
+    oid_cache_ttl: float = OID_CACHE_TTL_S,
+    oid_batch_size: int = OID_BATCH_SIZE,
 ) -> dict[str, Any]:
-    engine, auth, target, context = _snmp_session(router_ip, community, port, timeout, retries)
-    uptime_ticks = _snmp_get(engine, auth, target, context, SYS_UPTIME_OID)
-    uptime_seconds = _safe_int(uptime_ticks)
-    sys_name = _snmp_get_optional(engine, auth, target, context, SYS_NAME_OID)
-    sys_descr = _snmp_get_optional(engine, auth, target, context, SYS_DESCR_OID)
-
-    names = _snmp_walk(engine, auth, target, context, IF_NAME_OID)
-    if not names:
-        names = _snmp_walk(engine, auth, target, context, IF_DESCR_OID)
-
-    in_octets = _snmp_walk(engine, auth, target, context, IF_HC_IN_OID)
-    out_octets = _snmp_walk(engine, auth, target, context, IF_HC_OUT_OID)
-    counter_bits = 64
-    if not in_octets or not out_octets:
-        in_octets = _snmp_walk(engine, auth, target, context, IF_IN_OID)
-        out_octets = _snmp_walk(engine, auth, target, context, IF_OUT_OID)
-        counter_bits = 32
-
-    oper_status = _snmp_walk(engine, auth, target, context, IF_OPER_OID)
-    indices = set(names) | set(in_octets) | set(out_octets) | set(oper_status)
-
-    interfaces: list[dict[str, Any]] = []
-    total_in = 0
-    total_out = 0
-
-    def index_key(value: str):
-        try:
-            return int(value)
-        except ValueError:
-            return value
-
-    for index in sorted(indices, key=index_key):
-        name = names.get(index)
-        name_str = str(name) if name is not None else f"if{index}"
-        in_value = _safe_int(in_octets.get(index))
-        out_value = _safe_int(out_octets.get(index))
-        status_value = _safe_int(oper_status.get(index))
-        status = OPER_STATUS.get(status_value or 0, "unknown")
-        if in_value is not None:
-            total_in += in_value
-        if out_value is not None:
-            total_out += out_value
-        interfaces.append(
-            {
-                "index": _safe_int(index),
-                "name": name_str,
-                "oper_status": status,
-                "in_octets": in_value,
-                "out_octets": out_value,
-            }
+    lock, *session = _cached_session(router_ip, community, port, timeout, retries)
+    # An engine is not thread-safe, so concurrent polls of one target take turns.
+    with lock:
+        return _collect_snmp_metrics(
+            session, router_ip, community, port, max_repetitions, oid_cache_ttl, oid_batch_size
+        )
+
+
+def _collect_snmp_metrics(
+    session: list[Any],
+    router_ip: str,
+    community: str,
+    port: int,
+    max_repetitions: int,
+    oid_cache_ttl: float,
+    oid_batch_size: int,
+) -> dict[str, Any]:
+    engine, auth, target, context = session
+    uptime_ticks, sys_name, sys_descr = _snmp_get(
+        engine, auth, target, context, SYS_UPTIME_OID, SYS_NAME_OID, SYS_DESCR_OID
+    )
+    # sysUpTime is in TimeTicks (hundredths of a second).
+    uptime_ticks = _safe_int(uptime_ticks)
+    uptime_seconds = uptime_ticks // 100 if uptime_ticks is not None else None
+
+    # Different communities can expose different views of the same agent.
+    cache_key = (router_ip, port, community)
+    cached = _OID_CACHE.get(cache_key)
+    columns = None
+    if cached is not None and cached[0] > time.monotonic():
+        _, column_indices, names, counter_bits = cached
+        if counter_bits == 64:
+            counter_oids = [IF_HC_IN_OID, IF_HC_OUT_OID]
+        else:
+            counter_oids = [IF_IN_OID, IF_OUT_OID]
+        columns = _snmp_get_columns(
+            engine,
+            auth,
+            target,
+            context,
+            [*counter_oids, IF_OPER_OID],
+            column_indices,
+            oid_batch_size,
+        )
+        if columns is None:
+            _OID_CACHE.pop(cache_key, None)
+    if columns is not None:
+        in_octets, out_octets, oper_status = columns
+    else:
+        names, in_octets, out_octets, oper_status = _snmp_bulk_walk(
+            engine,
+            auth,
+            target,
+            context,
+            [IF_NAME_OID, IF_HC_IN_OID, IF_HC_OUT_OID, IF_OPER_OID],
+            max_repetitions,
+        )
+        if not names:
+            (names,) = _snmp_bulk_walk(
+                engine, auth, target, context, [IF_DESCR_OID], max_repetitions
+            )
+
+        counter_bits = 64
+        if not in_octets or not out_octets:
+            counter_bits = 32
+            # Without ifTable names or status the agent only serves the system
+            # group, so the 32-bit counter walk would come back empty too.
+            if names or oper_status:
+                in_octets, out_octets = _snmp_bulk_walk(
+                    engine, auth, target, context, [IF_IN_OID, IF_OUT_OID], max_repetitions
+                )
+        if names or in_octets or out_octets or oper_status:
+            _OID_CACHE[cache_key] = (
+                time.monotonic() + oid_cache_ttl,
+                [sorted(in_octets), sorted(out_octets), sorted(oper_status)],
+                names,
+                counter_bits,
+            )
+
+    interfaces_by_index: dict[int, dict[str, Any]] = {}
+    for field, values in (
+        ("name", names),
+        ("oper_status", oper_status),
+        ("in_octets", in_octets),
+        ("out_octets", out_octets),
+    ):
+        for index, value in values.items():
+            entry = interfaces_by_index.get(index)
+            if entry is None:
+                entry = interfaces_by_index[index] = {
+                    "index": index,
+                    "name": None,
+                    "oper_status": None,
+                    "in_octets": None,
+                    "out_octets": None,
+                }
+            entry[field] = value
+    interfaces = [interfaces_by_index[index] for index in sorted(interfaces_by_index)]
+    for interface in interfaces:
+        if interface["name"] is None:
+            interface["name"] = f"if{interface['index']}"
+        interface["oper_status"] = OPER_STATUS.get(
+            _safe_int(interface["oper_status"]) or 0, "unknown"
         )
+        interface["in_octets"] = _safe_int(interface["in_octets"])
+        interface["out_octets"] = _safe_int(interface["out_octets"])
+    # Missing (None) and zero counters add nothing, so filter(None) drops both
+    # and the whole reduction runs in C on arbitrary-precision ints.
+    total_in = sum(filter(None, map(itemgetter("in_octets"), interfaces)))
+    total_out = sum(filter(None, map(itemgetter("out_octets"), interfaces)))
 
     interfaces_up = sum(1 for iface in interfaces if iface.get("oper_status") == "up")
     snmp_limited = len(interfaces) == 0
-    wan_iface = _match_interface(interfaces, ["wan"])
-    lan_iface = _match_interface(interfaces, ["lan"])
+    lowered = [(interface, interface["name"].lower()) for interface in interfaces]
+    wan_iface = next((interface for interface, name in lowered if "wan" in name), None)
+    lan_iface = next(
+        (interface for interface, name in lowered if "lan" in name and "wlan" not in name),
+        None,
+    )
 
-    collected_at = datetime.now(timezone.utc).isoformat()
+    collected_at = datetime.now(timezone.utc)
 
     return {
         "monitoring_mode": "snmp",
         "router_ip": router_ip,
         "status": "online",
-        "sys_name": str(sys_name) if sys_name is not None else None,
-        "sys_descr": str(sys_descr) if sys_descr is not None else None,
+        "sys_name": sys_name,
+        "sys_descr": sys_descr,
         "uptime_seconds": uptime_seconds,
         "uptime": _format_uptime(uptime_seconds or 0),
         "interface_count": len(interfaces),
@@ -225,38 +411,89 @@ def collect_snmp_metrics(
     }
 
 
-def _parse_latency_ms(output: str) -> float | None:
-    match = re.search(r"(\d+(?:\.\d+)?)\s*ms", output)
-    if not match:
-        return None
-    try:
-        return float(match.group(1))
-    except ValueError:
-        return None
+def _parse_latency_ms(*outputs: str | None) -> float | None:
+    for output in outputs:
+        if not output:
+            continue
+        match = _LATENCY_RE.search(output)
+        if match:
+            return float(match.group(1))
+    return None
 
 
-def passive_probe(router_ip: str, reason: str) -> dict[str, Any]:
+_icmp_seq = itertools.count()
+
+
+async def _icmp_ping(ip: str, timeout: float) -> float | None:
+    """Send one ICMP echo and return the round trip in ms, or ``None`` on timeout.
+
+    Raises ``PermissionError`` when no ICMP socket may be opened (see
+    net.ipv4.ping_group_range).
+    """
+    sock = icmp.open_socket()
+    if sock is None:
+        raise PermissionError("ICMP sockets are not available")
+    with sock:
+        sock.setblocking(False)
+        # Linux datagram sockets rewrite the identifier, so it is only checked
+        # on raw sockets, which also see every other process's replies.
+        ident = os.getpid() & 0xFFFF
+        check_ident = sock.type == socket.SOCK_RAW
+        seq = next(_icmp_seq) & 0xFFFF
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        started = time.perf_counter_ns()
+        try:
+            sock.connect((ip, 0))
+            sock.send(icmp.echo_request(ident, seq))
+        except OSError:
+            return None
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                reply = await asyncio.wait_for(loop.sock_recv(sock, 1024), remaining)
+            except (asyncio.TimeoutError, OSError):
+                return None
+            echo = icmp.parse_echo_reply(reply)
+            if echo is not None and echo[1] == seq and (not check_ident or echo[0] == ident):
+                return round((time.perf_counter_ns() - started) / 1_000_000, 3)
+
+
+async def _ping_subprocess(router_ip: str) -> tuple[bool, float | None]:
     if sys.platform.startswith("win"):
         command = ["ping", "-n", "1", "-w", "1200", router_ip]
     else:
         command = ["ping", "-c", "1", "-W", "1", router_ip]
-    reachable = False
-    latency = None
     try:
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            timeout=2,
-            check=False,
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
-        output = (result.stdout or "") + (result.stderr or "")
-        reachable = result.returncode == 0
-        latency = _parse_latency_ms(output)
     except Exception:
-        reachable = False
-        latency = None
-    collected_at = datetime.now(timezone.utc).isoformat()
+        return False, None
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=2)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return False, None
+    latency = _parse_latency_ms(
+        stdout.decode(errors="replace"), stderr.decode(errors="replace")
+    )
+    return process.returncode == 0, latency
+
+
+async def passive_probe(router_ip: str, reason: str) -> dict[str, Any]:
+    try:
+        latency = await _icmp_ping(router_ip, PROBE_TIMEOUT_S)
+        reachable = latency is not None
+    except OSError:
+        # No ICMP socket permission (see net.ipv4.ping_group_range): use ping.
+        reachable, latency = await _ping_subprocess(router_ip)
+    collected_at = datetime.now(timezone.utc)
     return {
         "monitoring_mode": "passive",
         "router_ip": router_ip,
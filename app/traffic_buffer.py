@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+from typing import Any
+
+from sqlalchemy import insert
+
+from app import models
+from app.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+TRAFFIC_FLUSH_INTERVAL_MS = int(os.getenv("TRAFFIC_FLUSH_INTERVAL_MS", "500"))
+TRAFFIC_FLUSH_MAX_ROWS = int(os.getenv("TRAFFIC_FLUSH_MAX_ROWS", "500"))
+TRAFFIC_QUEUE_MAXSIZE = int(os.getenv("TRAFFIC_QUEUE_MAXSIZE", "10000"))
+
+
+class TrafficBuffer:
+    """Accumulates traffic samples and writes them in multi-row batches.
+
+    A batch is flushed when it reaches ``max_rows`` or ``interval_ms`` after its
+    first row arrived, whichever comes first. The queue is bounded, so producers
+    wait instead of growing memory when the database falls behind.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = TRAFFIC_FLUSH_MAX_ROWS,
+        interval_ms: int = TRAFFIC_FLUSH_INTERVAL_MS,
+        maxsize: int = TRAFFIC_QUEUE_MAXSIZE,
+    ) -> None:
+        self.max_rows = max(1, max_rows)
+        self.interval = max(0, interval_ms) / 1000
+        self.maxsize = maxsize
+        self._queue: asyncio.Queue[dict[str, Any] | None] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None or self._queue is None:
+            return
+        # The sentinel queues up behind pending rows, so everything accepted
+        # before shutdown is still written.
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def put(self, row: dict[str, Any]) -> None:
+        if self._queue is None:
+            raise RuntimeError("Traffic buffer is not running")
+        await self._queue.put(row)
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        try:
+            async with SessionLocal() as db:
+                await db.execute(insert(models.TrafficSample), batch)
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to write %d buffered traffic samples.", len(batch))
+
+
+traffic_buffer = TrafficBuffer()
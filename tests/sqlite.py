@@ -0,0 +1,27 @@
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import models
+
+
+async def seeded_engine(create_tables: bool = True) -> AsyncEngine:
+    """In-memory SQLite engine with 20 devices and 5 traffic samples each."""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    if not create_tables:
+        return engine
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    async with async_sessionmaker(bind=engine)() as db:
+        devices = [
+            models.Device(ip_address=f"10.0.0.{i}", mac_address=f"02:00:00:00:00:{i:02x}")
+            for i in range(1, 21)
+        ]
+        db.add_all(devices)
+        await db.flush()
+        db.add_all(
+            models.TrafficSample(device_id=device.id, bytes_in=i, bytes_out=i)
+            for device in devices
+            for i in range(5)
+        )
+        await db.commit()
+    return engine
@@ -0,0 +1,89 @@
+import asyncio
+
+import msgspec
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import crud, models, schemas_fast
+from tests.sqlite import seeded_engine
+
+
+async def _count_list_queries(fetch, row_type) -> tuple[int, list]:
+    engine = await seeded_engine()
+    statements: list[str] = []
+    try:
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        event.listen(
+            engine.sync_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        items = []
+        async with session_factory() as db:
+            rows = await fetch(db)
+            async for batch in rows.partitions():
+                # Same conversion as the list routes; any lazy load would raise here.
+                items.extend(msgspec.convert(batch, list[row_type], from_attributes=True))
+        return len(statements), items
+    finally:
+        await engine.dispose()
+
+
+def test_stream_devices_runs_a_single_query():
+    count, items = asyncio.run(_count_list_queries(crud.stream_devices, schemas_fast.Device))
+
+    assert len(items) == 20
+    assert count == 1
+
+
+def test_stream_traffic_samples_runs_a_single_query():
+    count, items = asyncio.run(
+        _count_list_queries(
+            lambda db: crud.stream_traffic_samples(db, limit=50), schemas_fast.TrafficSample
+        )
+    )
+
+    assert len(items) == 50
+    assert count == 1
+
+
+def test_stream_traffic_samples_refuses_lazy_loads():
+    async def touch_device():
+        engine = await seeded_engine()
+        try:
+            async with async_sessionmaker(bind=engine)() as db:
+                rows = await crud.stream_traffic_samples(db, limit=1)
+                sample = (await rows.all())[0]
+                return sample.device
+        finally:
+            await engine.dispose()
+
+    with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+        asyncio.run(touch_device())
+
+
+def test_upsert_discovered_devices_keeps_last_ip_for_repeated_mac():
+    mac = "02:00:00:00:00:01"
+
+    async def discover():
+        engine = await seeded_engine()
+        try:
+            session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+            async with session_factory() as db:
+                saved = await crud.upsert_discovered_devices(
+                    db, [("10.0.0.1", mac), ("10.0.0.80", mac)]
+                )
+            async with session_factory() as db:
+                stored = (
+                    await db.scalars(select(models.Device).where(models.Device.mac_address == mac))
+                ).all()
+            return saved, stored
+        finally:
+            await engine.dispose()
+
+    saved, stored = asyncio.run(discover())
+
+    assert [device.ip_address for device in saved] == ["10.0.0.80"]
+    assert [device.ip_address for device in stored] == ["10.0.0.80"]
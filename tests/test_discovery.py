@@ -0,0 +1,144 @@
+import subprocess
+
+from app import discovery
+
+ARP_A_OUTPUT = """\
+? (192.168.1.1) at a4:2b:b0:11:22:33 on en0 ifscope [ethernet]
+? (192.168.1.20) at (incomplete) on en0 ifscope [ethernet]
+? (192.168.1.255) at ff:ff:ff:ff:ff:ff on en0 ifscope [ethernet]
+
+Interface: 192.168.1.50 --- 0x7
+  Internet Address      Physical Address      Type
+  192.168.1.30          3C-52-82-AA-BB-CC     dynamic
+  192.168.1.40          00-00-00-00-00-00     invalid
+"""
+
+
+def test_read_arp_table_parses_arp_command(monkeypatch):
+    calls = []
+
+    def fake_run(args, **kwargs):
+        calls.append(args)
+        return subprocess.CompletedProcess(args, 0, stdout=ARP_A_OUTPUT, stderr="")
+
+    monkeypatch.setattr(discovery.sys, "platform", "darwin")
+    monkeypatch.setattr(discovery.subprocess, "run", fake_run)
+
+    assert discovery._read_arp_table() == [
+        ("192.168.1.1", "a4:2b:b0:11:22:33"),
+        ("192.168.1.30", "3c:52:82:aa:bb:cc"),
+    ]
+    assert calls == [["arp", "-a"]]
+
+
+PROC_NET_ARP = """\
+IP address       HW type     Flags       HW address            Mask     Device
+192.168.1.1      0x1         0x2         a4:2b:b0:11:22:33     *        eth0
+192.168.1.20     0x1         0x0         00:00:00:00:00:00     *        eth0
+192.168.1.21     0x1         0x0         3c:52:82:aa:bb:cc     *        eth0
+192.168.1.22     0x1         0x2         00:00:00:00:00:00     *        eth0
+192.168.1.30     0x1         0x6         3C:52:82:AA:BB:DD     *        eth0
+"""
+
+
+def test_read_proc_arp_skips_incomplete_entries(monkeypatch, tmp_path):
+    arp_file = tmp_path / "arp"
+    arp_file.write_text(PROC_NET_ARP, encoding="ascii")
+    monkeypatch.setattr(discovery, "PROC_NET_ARP", str(arp_file))
+
+    assert discovery._read_proc_arp() == [
+        ("192.168.1.1", "a4:2b:b0:11:22:33"),
+        ("192.168.1.30", "3c:52:82:aa:bb:dd"),
+    ]
+
+
+def test_read_arp_table_prefers_proc_on_linux(monkeypatch, tmp_path):
+    arp_file = tmp_path / "arp"
+    arp_file.write_text(PROC_NET_ARP, encoding="ascii")
+    monkeypatch.setattr(discovery, "PROC_NET_ARP", str(arp_file))
+    monkeypatch.setattr(discovery.sys, "platform", "linux")
+
+    def fail_run(*args, **kwargs):
+        raise AssertionError("arp -a should not run when /proc/net/arp is readable")
+
+    monkeypatch.setattr(discovery.subprocess, "run", fail_run)
+
+    assert [ip for ip, _ in discovery._read_arp_table()] == ["192.168.1.1", "192.168.1.30"]
+
+
+def test_read_proc_arp_missing_file(monkeypatch, tmp_path):
+    monkeypatch.setattr(discovery, "PROC_NET_ARP", str(tmp_path / "missing"))
+
+    assert discovery._read_proc_arp() is None
+
+
+SUBNET = "192.168.5.0/29"  # hosts .1 to .6
+
+
+def _patch_discovery(monkeypatch, arp_reads):
+    reads = iter(arp_reads)
+    swept = []
+    monkeypatch.setattr(discovery, "_read_arp_table", lambda: next(reads))
+    monkeypatch.setattr(discovery, "_ping_sweep", lambda hosts: swept.append(hosts))
+    return swept
+
+
+def test_discover_devices_skips_sweep_when_arp_is_warm(monkeypatch):
+    swept = _patch_discovery(
+        monkeypatch,
+        [
+            [
+                ("192.168.5.1", "02:00:00:00:00:01"),
+                ("192.168.5.2", "02:00:00:00:00:02"),
+                ("192.168.5.3", "02:00:00:00:00:03"),
+                ("10.0.0.1", "02:00:00:00:00:09"),
+            ]
+        ],
+    )
+
+    devices = discovery.discover_devices(None, SUBNET)
+
+    assert swept == []
+    assert [ip for ip, _ in devices] == ["192.168.5.1", "192.168.5.2", "192.168.5.3"]
+
+
+def test_discover_devices_sweeps_only_missing_hosts(monkeypatch):
+    swept = _patch_discovery(
+        monkeypatch,
+        [
+            [("192.168.5.1", "02:00:00:00:00:01"), ("192.168.5.4", "02:00:00:00:00:04")],
+            [("192.168.5.1", "02:00:00:00:00:01")],
+        ],
+    )
+
+    discovery.discover_devices(None, SUBNET)
+
+    assert swept == [["192.168.5.2", "192.168.5.3", "192.168.5.5", "192.168.5.6"]]
+
+
+def test_discover_devices_merges_second_arp_read(monkeypatch):
+    _patch_discovery(
+        monkeypatch,
+        [
+            [("192.168.5.1", "02:00:00:00:00:01")],
+            [
+                ("192.168.5.1", "02:00:00:00:00:01"),
+                ("192.168.5.5", "02:00:00:00:00:05"),
+                ("10.0.0.1", "02:00:00:00:00:09"),
+            ],
+        ],
+    )
+
+    devices = discovery.discover_devices(None, SUBNET)
+
+    assert devices == [
+        ("192.168.5.1", "02:00:00:00:00:01"),
+        ("192.168.5.5", "02:00:00:00:00:05"),
+    ]
+
+
+def test_discover_devices_arp_only_never_sweeps(monkeypatch):
+    swept = _patch_discovery(monkeypatch, [[]])
+
+    assert discovery.discover_devices(None, SUBNET, mode="arp_only") == []
+    assert swept == []
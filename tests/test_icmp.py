@@ -0,0 +1,48 @@
+import struct
+
+from app import icmp
+
+
+def _reply(ident: int, seq: int, icmp_type: int = icmp.ICMP_ECHO_REPLY) -> bytes:
+    return struct.pack("!BBHHH", icmp_type, 0, 0, ident, seq) + icmp.ICMP_PAYLOAD
+
+
+def _ipv4_header(ihl: int = 5) -> bytes:
+    header = struct.pack("!BBHHHBBH4s4s", 0x40 | ihl, 0, 0, 0, 0, 64, 1, 0, bytes(4), bytes(4))
+    return header + bytes((ihl - 5) * 4)
+
+
+def test_echo_request_checksum():
+    packet = icmp.echo_request(0x1234, 7)
+
+    assert packet[0] == icmp.ICMP_ECHO_REQUEST
+    assert struct.unpack("!HH", packet[4:8]) == (0x1234, 7)
+    assert packet.endswith(icmp.ICMP_PAYLOAD)
+    # A packet carrying a valid checksum sums to zero.
+    assert icmp._checksum(packet) == 0
+
+
+def test_echo_request_checksum_odd_length(monkeypatch):
+    monkeypatch.setattr(icmp, "ICMP_PAYLOAD", b"odd")
+
+    assert icmp._checksum(icmp.echo_request(1, 1)) == 0
+
+
+def test_parse_echo_reply_without_ip_header():
+    assert icmp.parse_echo_reply(_reply(0xBEEF, 3)) == (0xBEEF, 3)
+
+
+def test_parse_echo_reply_with_ip_header():
+    assert icmp.parse_echo_reply(_ipv4_header() + _reply(0xBEEF, 3)) == (0xBEEF, 3)
+    assert icmp.parse_echo_reply(_ipv4_header(ihl=6) + _reply(1, 2)) == (1, 2)
+
+
+def test_parse_echo_reply_ignores_other_types():
+    assert icmp.parse_echo_reply(_reply(1, 1, icmp_type=icmp.ICMP_ECHO_REQUEST)) is None
+    assert icmp.parse_echo_reply(_ipv4_header() + _reply(1, 1, icmp_type=3)) is None
+
+
+def test_parse_echo_reply_short_packet():
+    assert icmp.parse_echo_reply(b"") is None
+    assert icmp.parse_echo_reply(_reply(1, 1)[:7]) is None
+    assert icmp.parse_echo_reply(_ipv4_header() + _reply(1, 1)[:4]) is None
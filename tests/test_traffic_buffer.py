@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timezone
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import models, traffic_buffer
+from app.traffic_buffer import TrafficBuffer
+from tests.sqlite import seeded_engine
+
+SEEDED_SAMPLES = 100
+
+
+def _row(bytes_in: int) -> dict:
+    return {
+        "device_id": 1,
+        "bytes_in": bytes_in,
+        "bytes_out": 0,
+        "timestamp": datetime.now(timezone.utc),
+    }
+
+
+async def _run_buffer(monkeypatch, scenario, create_tables: bool = True, **options):
+    engine = await seeded_engine(create_tables)
+    session_factory = async_sessionmaker(bind=engine)
+    monkeypatch.setattr(traffic_buffer, "SessionLocal", session_factory)
+    buffer = TrafficBuffer(**options)
+    batches: list[int] = []
+    flush = buffer._flush
+
+    async def recording_flush(batch):
+        batches.append(len(batch))
+        await flush(batch)
+
+    buffer._flush = recording_flush
+    try:
+        await buffer.start()
+        await scenario(buffer)
+        if not create_tables:
+            return list(batches), None
+        async with session_factory() as db:
+            stored = await db.scalar(select(func.count()).select_from(models.TrafficSample))
+        return list(batches), stored - SEEDED_SAMPLES
+    finally:
+        await buffer.stop()
+        await engine.dispose()
+
+
+def test_flushes_when_batch_is_full(monkeypatch):
+    async def scenario(buffer):
+        for i in range(5):
+            await buffer.put(_row(i))
+        await asyncio.sleep(0.1)
+
+    batches, stored = asyncio.run(
+        _run_buffer(monkeypatch, scenario, max_rows=3, interval_ms=60_000)
+    )
+
+    # The full batch is written right away; the remainder waits for the interval.
+    assert batches == [3]
+    assert stored == 3
+
+
+def test_flushes_after_interval(monkeypatch):
+    async def scenario(buffer):
+        await buffer.put(_row(1))
+        await buffer.put(_row(2))
+        await asyncio.sleep(0.2)
+
+    batches, stored = asyncio.run(
+        _run_buffer(monkeypatch, scenario, max_rows=100, interval_ms=20)
+    )
+
+    assert batches == [2]
+    assert stored == 2
+
+
+def test_stop_drains_pending_rows(monkeypatch):
+    async def scenario(buffer):
+        for i in range(4):
+            await buffer.put(_row(i))
+        await buffer.stop()
+
+    batches, stored = asyncio.run(
+        _run_buffer(monkeypatch, scenario, max_rows=100, interval_ms=60_000)
+    )
+
+    assert batches == [4]
+    assert stored == 4
+
+
+def test_failed_batch_is_logged_and_buffer_keeps_running(monkeypatch, caplog):
+    async def scenario(buffer):
+        await buffer.put(_row(1))
+        await buffer.put(_row(2))
+        await asyncio.sleep(0.1)
+        await buffer.put(_row(3))
+        await asyncio.sleep(0.1)
+
+    with caplog.at_level(logging.ERROR, logger=traffic_buffer.logger.name):
+        batches, _ = asyncio.run(
+            _run_buffer(monkeypatch, scenario, create_tables=False, max_rows=100, interval_ms=20)
+        )
+
+    assert batches == [2, 1]
+    assert "Failed to write 2 buffered traffic samples." in caplog.messages
+    assert "Failed to write 1 buffered traffic samples." in caplog.messages